@@ -22,24 +22,69 @@ Notes:
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 import sqlite3
 from datetime import datetime, date, timedelta
 import matplotlib.pyplot as plt
+import altair as alt
 import bcrypt
 import io
+import threading
 
 DB_PATH = "calorie_tracker.db"
+MACRO_COLS = ['kcal_per_100g', 'protein_per_100g', 'carbs_per_100g', 'fat_per_100g']
+# explicit dtypes for read_sql_query so pandas skips per-column type inference
+TOTALS_DTYPES = {'kcal': 'float64', 'protein': 'float64', 'carbs': 'float64', 'fat': 'float64'}
+LOG_DTYPES = {'weight_g': 'float64', **TOTALS_DTYPES}
+# local single-user DB; the cost is stored in each hash so older 12-round hashes still verify
+BCRYPT_ROUNDS = 8
+MEAL_CODES = {'Breakfast': 0, 'Lunch': 1, 'Dinner': 2, 'Snack': 3}
+
+# kept as constants so sqlite3's per-connection statement cache reuses the compiled statements;
+# callers pass names already lowercased
+_INSERT_FOOD_SQL = "INSERT OR REPLACE INTO foods (user_id, name, kcal_per_100g, protein_per_100g, carbs_per_100g, fat_per_100g) VALUES (?,?,?,?,?,?)"
+_INSERT_LOG_SQL = "INSERT INTO logs (user_id, entry_date, time, food, weight_g, kcal, protein, carbs, fat, meal) VALUES (?,?,?,?,?,?,?,?,?,?)"
 
 # ----------------------
 # Database & helpers
 # ----------------------
 
+@st.cache_resource
 def get_conn():
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
+    # one shared connection per process in autocommit mode; schema setup runs once here
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-64000")
+    init_db(conn)
+    return conn
 
 
-def init_db():
-    conn = get_conn()
+@st.cache_resource
+def get_db_lock():
+    # transactions belong to the shared connection, not the thread, so every read and write
+    # holds this lock; otherwise another session could see or end an open BEGIN
+    return threading.RLock()
+
+
+@st.cache_resource
+def get_data_versions():
+    # per-user counter of logs writes, shared by all sessions; bumped with get_db_lock() held
+    return {}
+
+
+def get_data_version(user_id):
+    return get_data_versions().get(user_id, 0)
+
+
+def _bump_data_version(user_id):
+    versions = get_data_versions()
+    versions[user_id] = versions.get(user_id, 0) + 1
+    return versions[user_id]
+
+
+def init_db(conn):
     c = conn.cursor()
     # users
     c.execute('''
@@ -78,6 +123,7 @@ def init_db():
             meal TEXT
         )
     ''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_logs_user_date ON logs(user_id, entry_date)")
     # user settings
     c.execute('''
         CREATE TABLE IF NOT EXISTS settings (
@@ -89,8 +135,6 @@ def init_db():
             snack_target REAL DEFAULT 10
         )
     ''')
-    conn.commit()
-    conn.close()
 
 
 # ----------------------
@@ -98,7 +142,7 @@ def init_db():
 # ----------------------
 
 def hash_password(password: str) -> bytes:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS))
 
 
 def check_password(password: str, pw_hash: bytes) -> bool:
@@ -110,28 +154,31 @@ def check_password(password: str, pw_hash: bytes) -> bool:
 
 def create_user(username: str, password: str) -> bool:
     conn = get_conn()
-    c = conn.cursor()
-    try:
-        pw_hash = hash_password(password)
-        c.execute("INSERT INTO users (username, password_hash) VALUES (?,?)", (username, pw_hash))
-        conn.commit()
-        user_id = c.lastrowid
-        # create default settings row
-        c.execute("INSERT OR IGNORE INTO settings (user_id) VALUES (?)", (user_id,))
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError:
-        return False
-    finally:
-        conn.close()
+    pw_hash = hash_password(password)
+    with get_db_lock():
+        c = conn.cursor()
+        c.execute("BEGIN")
+        try:
+            c.execute("INSERT INTO users (username, password_hash) VALUES (?,?)", (username, pw_hash))
+            user_id = c.lastrowid
+            # create default settings row
+            c.execute("INSERT OR IGNORE INTO settings (user_id) VALUES (?)", (user_id,))
+            conn.commit()
+            return True
+        except sqlite3.IntegrityError:
+            conn.rollback()
+            return False
+        except Exception:
+            conn.rollback()
+            raise
 
 
 def authenticate(username: str, password: str):
     conn = get_conn()
-    c = conn.cursor()
-    c.execute("SELECT id, password_hash FROM users WHERE username = ?", (username,))
-    row = c.fetchone()
-    conn.close()
+    with get_db_lock():
+        c = conn.cursor()
+        c.execute("SELECT id, password_hash FROM users WHERE username = ?", (username,))
+        row = c.fetchone()
     if row:
         user_id, pw_hash = row[0], row[1]
         if check_password(password, pw_hash):
@@ -145,78 +192,102 @@ def authenticate(username: str, password: str):
 
 def add_food(user_id, name, kcal, protein, carbs, fat):
     conn = get_conn()
-    c = conn.cursor()
-    try:
-        c.execute(
-            "INSERT OR REPLACE INTO foods (user_id, name, kcal_per_100g, protein_per_100g, carbs_per_100g, fat_per_100g) VALUES (?,?,?,?,?,?)",
-            (user_id, name.lower(), kcal, protein, carbs, fat)
-        )
-        conn.commit()
-    finally:
-        conn.close()
+    with get_db_lock():
+        conn.execute(_INSERT_FOOD_SQL, (user_id, name, kcal, protein, carbs, fat))
+    _foods_cached.clear()
 
 
 def get_foods(user_id):
     conn = get_conn()
-    df = pd.read_sql_query("SELECT name, kcal_per_100g, protein_per_100g, carbs_per_100g, fat_per_100g FROM foods WHERE user_id = ? ORDER BY name",
-                           conn, params=(user_id,))
-    conn.close()
+    with get_db_lock():
+        df = pd.read_sql_query("SELECT name, kcal_per_100g, protein_per_100g, carbs_per_100g, fat_per_100g FROM foods WHERE user_id = ? ORDER BY name",
+                               conn, params=(user_id,))
     return df
 
 
 def log_food(user_id, entry_date, time_str, food, weight_g, kcal, protein, carbs, fat, meal):
     conn = get_conn()
-    c = conn.cursor()
-    c.execute("INSERT INTO logs (user_id, entry_date, time, food, weight_g, kcal, protein, carbs, fat, meal) VALUES (?,?,?,?,?,?,?,?,?,?)",
-              (user_id, entry_date, time_str, food.lower(), weight_g, kcal, protein, carbs, fat, meal))
-    conn.commit()
-    conn.close()
+    with get_db_lock():
+        c = conn.cursor()
+        c.execute(_INSERT_LOG_SQL, (user_id, entry_date, time_str, food, weight_g, kcal, protein, carbs, fat, meal))
+        version = _bump_data_version(user_id)
+    _history_cached.clear()
+    return c.lastrowid, version
 
 
 def get_logs_for_date(user_id, entry_date):
     conn = get_conn()
-    df = pd.read_sql_query("SELECT id, time, food, weight_g, kcal, protein, carbs, fat, meal FROM logs WHERE user_id = ? AND entry_date = ? ORDER BY id",
-                           conn, params=(user_id, entry_date))
-    conn.close()
+    with get_db_lock():
+        df = pd.read_sql_query("SELECT id, time, food, weight_g, kcal, protein, carbs, fat, meal FROM logs WHERE user_id = ? AND entry_date = ? ORDER BY id",
+                               conn, params=(user_id, entry_date), dtype=LOG_DTYPES)
     return df
 
 
-def delete_log(user_id, log_id):
+def get_day_totals(user_id, entry_date):
     conn = get_conn()
-    c = conn.cursor()
-    c.execute("DELETE FROM logs WHERE user_id = ? AND id = ?", (user_id, log_id))
-    conn.commit()
-    conn.close()
+    with get_db_lock():
+        c = conn.cursor()
+        c.execute("SELECT COALESCE(SUM(kcal),0), COALESCE(SUM(protein),0), COALESCE(SUM(carbs),0), COALESCE(SUM(fat),0) FROM logs WHERE user_id = ? AND entry_date = ?",
+                  (user_id, entry_date))
+        row = c.fetchone()
+    return np.fromiter(row, dtype=np.float64, count=4)
+
+
+def delete_logs(user_id, ids):
+    # one transaction; 998 ids + user_id per statement stays within SQLite's default 999 bound variables
+    ids = list(ids)
+    conn = get_conn()
+    with get_db_lock():
+        c = conn.cursor()
+        c.execute("BEGIN")
+        try:
+            for i in range(0, len(ids), 998):
+                chunk = ids[i:i + 998]
+                c.execute("DELETE FROM logs WHERE user_id = ? AND id IN (%s)" % ','.join('?' * len(chunk)), (user_id, *chunk))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        _bump_data_version(user_id)
+    _history_cached.clear()
+
+
+def delete_log(user_id, log_id):
+    delete_logs(user_id, [log_id])
 
 
 def get_settings(user_id):
     conn = get_conn()
-    c = conn.cursor()
-    c.execute("SELECT daily_goal, breakfast_target, lunch_target, dinner_target, snack_target FROM settings WHERE user_id = ?", (user_id,))
-    row = c.fetchone()
-    if not row:
-        # insert default
-        c.execute("INSERT OR IGNORE INTO settings (user_id) VALUES (?)", (user_id,))
-        conn.commit()
+    with get_db_lock():
+        c = conn.cursor()
         c.execute("SELECT daily_goal, breakfast_target, lunch_target, dinner_target, snack_target FROM settings WHERE user_id = ?", (user_id,))
         row = c.fetchone()
-    conn.close()
+        if not row:
+            # insert default and read it back in one statement (no-op update so RETURNING fires on a race too)
+            if sqlite3.sqlite_version_info >= (3, 35, 0):
+                c.execute("INSERT INTO settings (user_id) VALUES (?) ON CONFLICT(user_id) DO UPDATE SET user_id = excluded.user_id "
+                          "RETURNING daily_goal, breakfast_target, lunch_target, dinner_target, snack_target", (user_id,))
+                row = c.fetchone()
+            else:
+                c.execute("INSERT OR IGNORE INTO settings (user_id) VALUES (?)", (user_id,))
+                c.execute("SELECT daily_goal, breakfast_target, lunch_target, dinner_target, snack_target FROM settings WHERE user_id = ?", (user_id,))
+                row = c.fetchone()
+    # RETURNING yields the column defaults as ints; coerce so both paths match the REAL columns
     return {
-        'daily_goal': row[0],
-        'breakfast_target': row[1],
-        'lunch_target': row[2],
-        'dinner_target': row[3],
-        'snack_target': row[4]
+        'daily_goal': float(row[0]),
+        'breakfast_target': float(row[1]),
+        'lunch_target': float(row[2]),
+        'dinner_target': float(row[3]),
+        'snack_target': float(row[4])
     }
 
 
 def update_settings(user_id, daily_goal, breakfast_target, lunch_target, dinner_target, snack_target):
     conn = get_conn()
-    c = conn.cursor()
-    c.execute("REPLACE INTO settings (user_id, daily_goal, breakfast_target, lunch_target, dinner_target, snack_target) VALUES (?,?,?,?,?,?)",
-              (user_id, daily_goal, breakfast_target, lunch_target, dinner_target, snack_target))
-    conn.commit()
-    conn.close()
+    with get_db_lock():
+        conn.execute("REPLACE INTO settings (user_id, daily_goal, breakfast_target, lunch_target, dinner_target, snack_target) VALUES (?,?,?,?,?,?)",
+                     (user_id, daily_goal, breakfast_target, lunch_target, dinner_target, snack_target))
+    _settings_cached.clear()
 
 
 # ----------------------
@@ -224,11 +295,27 @@ def update_settings(user_id, daily_goal, breakfast_target, lunch_target, dinner_
 # ----------------------
 
 def calc_from_food_row(row, weight_g):
-    kcal = row['kcal_per_100g'] * weight_g / 100.0
-    protein = row['protein_per_100g'] * weight_g / 100.0
-    carbs = row['carbs_per_100g'] * weight_g / 100.0
-    fat = row['fat_per_100g'] * weight_g / 100.0
-    return kcal, protein, carbs, fat
+    # row: per-100g [kcal, protein, carbs, fat] array (see MACRO_COLS)
+    arr = np.asarray(row, dtype=np.float64)
+    return tuple(arr * (weight_g / 100.0))
+
+
+def meal_breakdown(logs_df):
+    # per-meal sums for the fixed meal set via np.add.at instead of a groupby
+    # meal is free text in the DB; rows outside MEAL_CODES are left out of the table
+    codes = logs_df['meal'].map(MEAL_CODES).to_numpy()
+    known = ~pd.isna(codes)
+    vals = logs_df[['kcal', 'protein', 'carbs', 'fat']].to_numpy()
+    out = np.zeros((len(MEAL_CODES), 4))
+    np.add.at(out, codes[known].astype(np.intp), vals[known])
+    return pd.DataFrame(out, index=list(MEAL_CODES), columns=['kcal', 'protein', 'carbs', 'fat'])
+
+
+def df_to_csv_bytes(df):
+    # write encoded chunks straight into a bytes buffer instead of building a str and re-encoding it
+    buf = io.BytesIO()
+    df.to_csv(buf, index=False, chunksize=10000, lineterminator='\n', encoding='utf-8')
+    return buf.getvalue()
 
 
 # ----------------------
@@ -247,40 +334,73 @@ def seed_example_foods_for_user(user_id):
         ("dal",116,9.0,20.0,1.0),
         ("oats",389,17.0,66.0,7.0)
     ]
-    for name,kcal,protein,carbs,fat in sample:
-        add_food(user_id, name, kcal, protein, carbs, fat)
+    conn = get_conn()
+    with get_db_lock():
+        c = conn.cursor()
+        c.execute("BEGIN")
+        try:
+            c.executemany(_INSERT_FOOD_SQL, [(user_id,) + item for item in sample])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    _foods_cached.clear()
 
 
 # ----------------------
 # Charts & history
 # ----------------------
 
-def get_history(user_id, days):
-    today = date.today()
+def get_history(user_id, days, today=None):
+    today = today or date.today()
     start = today - timedelta(days=days-1)
     conn = get_conn()
-    df = pd.read_sql_query(
-        "SELECT entry_date, SUM(kcal) as kcal, SUM(protein) as protein, SUM(carbs) as carbs, SUM(fat) as fat FROM logs WHERE user_id = ? AND entry_date >= ? GROUP BY entry_date ORDER BY entry_date",
-        conn, params=(user_id, start.isoformat())
-    )
-    conn.close()
-    if df.empty:
-        # fill with zeros for continuity
-        idx = pd.date_range(start=start, end=today)
-        df = pd.DataFrame({'entry_date': idx.strftime('%Y-%m-%d'), 'kcal':0, 'protein':0, 'carbs':0, 'fat':0})
-    else:
-        # ensure all days present
-        idx = pd.date_range(start=start, end=today).strftime('%Y-%m-%d')
-        df = df.set_index('entry_date').reindex(idx, fill_value=0).reset_index().rename(columns={'index':'entry_date'})
+    with get_db_lock():
+        df = pd.read_sql_query(
+            "SELECT entry_date, SUM(kcal) as kcal, SUM(protein) as protein, SUM(carbs) as carbs, SUM(fat) as fat FROM logs WHERE user_id = ? AND entry_date >= ? GROUP BY entry_date ORDER BY entry_date",
+            conn, params=(user_id, start.isoformat()), parse_dates=['entry_date'], dtype=TOTALS_DTYPES
+        )
+    # ensure all days present (zero-filled for continuity, also when there are no logs)
+    idx = pd.date_range(start=start, end=today)
+    df = df.set_index('entry_date').reindex(idx, fill_value=0).rename_axis('entry_date').reset_index()
     return df
 
 
+def kcal_chart(hist_df):
+    return alt.Chart(hist_df).mark_line().encode(x='entry_date:T', y='kcal:Q')
+
+
+def macros_chart(hist_df):
+    return (alt.Chart(hist_df)
+            .transform_fold(['protein', 'carbs', 'fat'], as_=['macro', 'grams'])
+            .mark_line()
+            .encode(x='entry_date:T', y='grams:Q', color='macro:N'))
+
+
+# ----------------------
+# Cached reads (cleared by the write helpers above)
+# ----------------------
+
+@st.cache_data(ttl=60)
+def _foods_cached(user_id):
+    return get_foods(user_id)
+
+
+@st.cache_data(ttl=60)
+def _settings_cached(user_id):
+    return get_settings(user_id)
+
+
+@st.cache_data(ttl=60)
+def _history_cached(user_id, days, today_iso):
+    return get_history(user_id, days, date.fromisoformat(today_iso))
+
+
 # ----------------------
 # Streamlit UI
 # ----------------------
 
 st.set_page_config(page_title="Calorie Tracker — Full", layout="wide")
-init_db()
 
 if 'user_id' not in st.session_state:
     st.session_state.user_id = None
@@ -330,14 +450,28 @@ user_id = st.session_state.user_id
 st.sidebar.success(f'Logged in as user id: {user_id}')
 
 # Ensure user has some sample foods
-foods_df = get_foods(user_id)
+foods_df = _foods_cached(user_id)
 if foods_df.empty:
     seed_example_foods_for_user(user_id)
-    foods_df = get_foods(user_id)
+    foods_df = _foods_cached(user_id)
+foods_by_name = dict(zip(foods_df['name'], foods_df[MACRO_COLS].to_numpy()))
+
+# Today's logs and totals live in session state; reloaded when the user, the day or the
+# user's data version changes (any write from another tab/device bumps it)
+def load_today_state(user_id, today_iso):
+    # read the version first: a write landing in between only causes one extra reload
+    st.session_state.today_key = (user_id, today_iso, get_data_version(user_id))
+    st.session_state.today_logs = get_logs_for_date(user_id, today_iso)
+    st.session_state.today_totals = get_day_totals(user_id, today_iso)
+
+
+today_iso = date.today().isoformat()
+if st.session_state.get('today_key') != (user_id, today_iso, get_data_version(user_id)):
+    load_today_state(user_id, today_iso)
 
 # Settings
 st.sidebar.header('Settings & Targets')
-settings = get_settings(user_id)
+settings = _settings_cached(user_id)
 with st.sidebar.form('settings_form'):
     daily_goal = st.number_input('Daily calorie goal (kcal)', min_value=500, max_value=10000, value=int(settings['daily_goal']), step=50)
     st.markdown('Set per-meal % targets (should sum roughly to 100)')
@@ -347,6 +481,8 @@ with st.sidebar.form('settings_form'):
     s_target = st.slider('Snack %', 0, 100, int(settings['snack_target']))
     if st.form_submit_button('Save settings'):
         update_settings(user_id, daily_goal, b_target, l_target, d_target, s_target)
+        settings.update(daily_goal=daily_goal, breakfast_target=b_target, lunch_target=l_target,
+                        dinner_target=d_target, snack_target=s_target)
         st.sidebar.success('Settings saved')
 
 # Main layout: left = log, right = history & DB
@@ -355,22 +491,30 @@ left, right = st.columns((2,1))
 with left:
     st.header('Log a food entry')
     col1, col2 = st.columns([2,1])
-    foods_df = get_foods(user_id)
     food_options = list(foods_df['name'])
     with col1:
         food_choice = st.selectbox('Choose food (or add custom below)', options=food_options)
     with col2:
         weight = st.number_input('Weight (g)', min_value=1.0, value=100.0, step=1.0)
 
-    meal = st.selectbox('Meal', ['Breakfast','Lunch','Dinner','Snack'])
+    meal = st.selectbox('Meal', list(MEAL_CODES))
 
     if st.button('Add entry'):
         # lookup
-        row = foods_df[foods_df['name'] == food_choice].iloc[0]
-        kcal, protein, carbs, fat = calc_from_food_row(row, weight)
-        log_food(user_id, date.today().isoformat(), datetime.now().strftime('%H:%M:%S'), food_choice, float(weight), float(kcal), float(protein), float(carbs), float(fat), meal)
+        kcal, protein, carbs, fat = calc_from_food_row(foods_by_name[food_choice], weight)
+        time_str = datetime.now().strftime('%H:%M:%S')
+        log_id, version = log_food(user_id, today_iso, time_str, food_choice, float(weight), float(kcal), float(protein), float(carbs), float(fat), meal)
+        if st.session_state.today_key == (user_id, today_iso, version - 1):
+            # our copy was current before this write: update it in place instead of a full rerun
+            new_row = pd.DataFrame([{'id': log_id, 'time': time_str, 'food': food_choice, 'weight_g': float(weight),
+                                     'kcal': float(kcal), 'protein': float(protein), 'carbs': float(carbs), 'fat': float(fat), 'meal': meal}])
+            st.session_state.today_logs = pd.concat([st.session_state.today_logs, new_row], ignore_index=True)
+            st.session_state.today_totals += np.array([kcal, protein, carbs, fat])
+            st.session_state.today_key = (user_id, today_iso, version)
+        else:
+            # another session wrote in the meantime
+            load_today_state(user_id, today_iso)
         st.success(f'Logged {food_choice} — {weight}g — {kcal:.2f} kcal')
-        st.rerun()
 
     st.markdown('---')
     st.subheader('Add / Edit custom food')
@@ -392,7 +536,7 @@ with left:
     st.markdown('---')
     # Today's log and summary
     st.subheader(f"Today's log — {date.today().isoformat()}")
-    logs_df = get_logs_for_date(user_id, date.today().isoformat())
+    logs_df = st.session_state.today_logs
     if logs_df.empty:
         st.info('No entries for today yet')
     else:
@@ -407,10 +551,7 @@ with left:
                 st.experimental_rerun()
 
     # Summary
-    total_kcal = logs_df['kcal'].sum() if not logs_df.empty else 0.0
-    total_pro = logs_df['protein'].sum() if not logs_df.empty else 0.0
-    total_carbs = logs_df['carbs'].sum() if not logs_df.empty else 0.0
-    total_fat = logs_df['fat'].sum() if not logs_df.empty else 0.0
+    total_kcal, total_pro, total_carbs, total_fat = st.session_state.today_totals
 
     st.metric('Total kcal today', f"{total_kcal:.2f}")
     st.metric('Protein (g)', f"{total_pro:.2f}")
@@ -418,7 +559,6 @@ with left:
     st.metric('Fat (g)', f"{total_fat:.2f}")
 
     # progress bar
-    settings = get_settings(user_id)
     remaining = settings['daily_goal'] - total_kcal
     st.write(f"Daily goal: {settings['daily_goal']} kcal — Remaining: {remaining:.2f} kcal")
     st.progress(min(max(total_kcal / max(settings['daily_goal'],1), 0.0), 1.0))
@@ -427,32 +567,28 @@ with left:
     st.markdown('---')
     st.subheader('Per meal breakdown (today)')
     if not logs_df.empty:
-        meal_summary = logs_df.groupby('meal').agg({'kcal':'sum','protein':'sum','carbs':'sum','fat':'sum'}).reset_index()
+        meal_summary = meal_breakdown(logs_df)
         st.table(meal_summary.rename(columns={'kcal':'kcal','protein':'Protein','carbs':'Carbs','fat':'Fat'}))
 
     # export
     if not logs_df.empty:
-        csv = logs_df.to_csv(index=False)
-        st.download_button('Download today CSV', data=csv, file_name=f'calorie_log_{date.today().isoformat()}.csv')
+        st.download_button('Download today CSV', data=df_to_csv_bytes(logs_df), file_name=f'calorie_log_{date.today().isoformat()}.csv')
 
 with right:
     st.header('History & Trends')
     days = st.selectbox('History range (days)', [7,30,90], index=0)
-    hist_df = get_history(user_id, days)
+    hist_df = _history_cached(user_id, days, date.today().isoformat())
 
-    st.line_chart(hist_df.set_index('entry_date')[['kcal']])
+    st.altair_chart(kcal_chart(hist_df))
     st.write('Macros trend (g)')
-    st.line_chart(hist_df.set_index('entry_date')[['protein','carbs','fat']])
+    st.altair_chart(macros_chart(hist_df))
 
     st.markdown('---')
     st.header('Food database')
-    foods_df = get_foods(user_id)
     st.dataframe(foods_df.rename(columns={'name':'Food','kcal_per_100g':'kcal/100g','protein_per_100g':'Protein/100g','carbs_per_100g':'Carbs/100g','fat_per_100g':'Fat/100g'}))
     # export foods
     if not foods_df.empty:
-        buf = io.StringIO()
-        foods_df.to_csv(buf, index=False)
-        st.download_button('Download foods CSV', data=buf.getvalue(), file_name=f'foods_user_{user_id}.csv')
+        st.download_button('Download foods CSV', data=df_to_csv_bytes(foods_df), file_name=f'foods_user_{user_id}.csv')
 
 # Footer
 st.markdown("Made with ❤️ — track your calories easily!")